@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Stock Query API
+Serves the ranked universe, allocations and latest signals over HTTP
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from itertools import islice
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from modules.stock_analysis import get_top_performers
+from models.portfolio_optimizer import allocate_portfolio
+
+RANKED_DATA_PATH = 'data/processed_data.csv'
+SIGNALS_PATH = 'data/recommendations.csv'
+RISK_LEVELS = ('low', 'medium', 'high')
+RELOAD_INTERVAL = 5  # seconds between checks for new data files
+
+# The current snapshot. It is never mutated, only replaced by rebinding this
+# name, so handlers read it without locks.
+_snapshot = None
+
+
+def _records(df):
+    """Convert a DataFrame to JSON-safe records keyed by ticker."""
+    if df is None:
+        return {}
+    # NaN and infinity are not valid JSON
+    df = df.replace([np.inf, -np.inf], np.nan)
+    clean = df.astype(object).where(df.notna(), None)
+    return clean.to_dict(orient='index')
+
+
+def _mtime(path):
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def load_snapshot():
+    """
+    Read the data files and precompute the ranking for every risk level
+
+    Records are converted to JSON-ready dicts here, once per data update,
+    so requests only slice and serialize them.
+    
+    Returns:
+        dict: Snapshot with 'ranked' and 'ranked_records' (per risk level),
+        'signals', 'mtimes' and 'loaded_at'
+    """
+    mtimes = (_mtime(RANKED_DATA_PATH), _mtime(SIGNALS_PATH))
+    universe = pd.read_csv(RANKED_DATA_PATH, index_col=0)
+    ranked = {
+        risk: get_top_performers(12, risk, df=universe, top_n=len(universe))
+        for risk in RISK_LEVELS
+    }
+    signals = None
+    if mtimes[1] is not None:
+        signals = pd.read_csv(SIGNALS_PATH, index_col=0)
+    return {
+        'ranked': ranked,
+        'ranked_records': {risk: _records(df) for risk, df in ranked.items()},
+        'signals': _records(signals),
+        'mtimes': mtimes,
+        'loaded_at': time.time(),
+    }
+
+
+async def watch_data_files():
+    """
+    Swap in a new snapshot once a changed data file has settled.
+
+    The writers rewrite the CSVs in place, so a file is only read after its
+    mtime has stayed the same across two checks; a half-written file would
+    otherwise be served as a truncated universe.
+    """
+    global _snapshot
+    loop = asyncio.get_running_loop()
+    previous = _snapshot['mtimes']
+    while True:
+        await asyncio.sleep(RELOAD_INTERVAL)
+        mtimes = (_mtime(RANKED_DATA_PATH), _mtime(SIGNALS_PATH))
+        settled = mtimes == previous
+        previous = mtimes
+        if not settled or mtimes == _snapshot['mtimes']:
+            continue
+        try:
+            # Parse off the event loop so requests keep being served
+            _snapshot = await loop.run_in_executor(None, load_snapshot)
+            print(f"Reloaded snapshot at {time.strftime('%H:%M:%S')}")
+        except Exception as e:
+            print(f"Error reloading snapshot, keeping previous one: {e}")
+
+
+def _risk(params):
+    risk = params.get('risk', 'medium').lower()
+    if risk not in RISK_LEVELS:
+        raise ValueError(f"risk must be one of {', '.join(RISK_LEVELS)}")
+    return risk
+
+
+def handle_top(snapshot, params):
+    k = int(params.get('k', 5))
+    return dict(islice(snapshot['ranked_records'][_risk(params)].items(), k))
+
+
+def handle_allocation(snapshot, params):
+    amount = float(params['amount'])
+    if not math.isfinite(amount) or amount <= 0:
+        raise ValueError("amount must be a positive, finite number")
+    risk = _risk(params)
+    top_stocks = snapshot['ranked'][risk].head(5)
+    return {
+        'Stocks': dict(islice(snapshot['ranked_records'][risk].items(), 5)),
+        'Portfolio Allocation': allocate_portfolio(amount, top_stocks),
+    }
+
+
+def handle_signals(snapshot, params):
+    signals = snapshot['signals']
+    if 'signal' in params:
+        wanted = params['signal'].lower()
+        signals = {t: r for t, r in signals.items() if str(r.get('Signal')).lower() == wanted}
+    return signals
+
+
+def handle_health(snapshot, params):
+    return {'loaded_at': snapshot['loaded_at']}
+
+
+ROUTES = {
+    '/top': handle_top,
+    '/allocation': handle_allocation,
+    '/signals': handle_signals,
+    '/health': handle_health,
+}
+
+
+def _response(status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+def dispatch(method, target):
+    if method != 'GET':
+        return '405 Method Not Allowed', {'error': 'only GET is supported'}
+    url = urlsplit(target)
+    handler = ROUTES.get(url.path)
+    if handler is None:
+        return '404 Not Found', {'error': f'unknown path {url.path}'}
+    params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    try:
+        return '200 OK', handler(_snapshot, params)
+    except (KeyError, ValueError) as e:
+        return '400 Bad Request', {'error': str(e)}
+
+
+async def handle_connection(reader, writer):
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip().lower()
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) != 3:
+                writer.write(_response('400 Bad Request', {'error': 'malformed request'}, False))
+                break
+            method, target, version = parts
+            keep_alive = headers.get('connection', 'keep-alive' if version == 'HTTP/1.1' else 'close') != 'close'
+
+            status, payload = dispatch(method, target)
+            writer.write(_response(status, payload, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host, port):
+    global _snapshot
+    _snapshot = load_snapshot()
+    server = await asyncio.start_server(handle_connection, host, port)
+    print(f"Serving stock API on http://{host}:{port}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), watch_data_files())
+
+
+def main():
+    """
+    Main function to run the query API
+    """
+    host = os.environ.get('API_HOST', '127.0.0.1')
+    port = int(os.environ.get('API_PORT', 8000))
+    try:
+        asyncio.run(serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -12,13 +12,25 @@ from datetime import datetime, timedelta
 import sys
 import os
 import subprocess
+from modules.resampler import INTRADAY_INTERVALS, MAX_PERIOD, annualization_factor
+from modules.adjustments import adjust_prices, events_from_actions, warn_split_jumps
+from modules.clustering import cluster_returns, split_tickers
+from models.portfolio_optimizer import hrp_weights
+from models.monte_carlo import effective_workers, run_monte_carlo
+from modules.result_cache import cache_key, load_cached, store_cached
+from modules.profiling import stage, start_run, write_summary
+from modules.risk_metrics import PORTFOLIO_LABEL, compute_risk_metrics
 
-def fetch_nifty50_data(period='1y'):
+BENCHMARK_TICKER = '^NSEI'
+
+def fetch_nifty50_data(period='1y', interval='1d'):
     """
     Fetches historical data for NIFTY 50 stocks
     
     Args:
         period (str): Time period for data (e.g., '1y' for 1 year)
+        interval (str): Bar size (e.g., '1d', '15m'); intraday periods are
+            capped to what yfinance serves
         
     Returns:
         DataFrame: Historical stock data
@@ -30,10 +42,14 @@ def fetch_nifty50_data(period='1y'):
         # Add more tickers as needed
     ]
     
+    if interval in INTRADAY_INTERVALS:
+        period = MAX_PERIOD[interval]
+    
     try:
         # Download historical data
-        print(f"Downloading data for {len(nifty50_tickers)} stocks...")
-        data = yf.download(nifty50_tickers, period=period)
+        print(f"Downloading {interval} data for {len(nifty50_tickers)} stocks...")
+        data = yf.download(nifty50_tickers, period=period, interval=interval,
+                           auto_adjust=False, actions=True)
         
         # Print detailed information about the DataFrame structure
         print(f"Data shape: {data.shape}")
@@ -49,6 +65,76 @@ def fetch_nifty50_data(period='1y'):
         print(f"Error fetching stock data: {e}")
         return None
 
+def fetch_benchmark_returns(period='1y', interval='1d'):
+    """
+    Fetches NIFTY 50 index returns, used as the benchmark for beta
+    
+    Args:
+        period (str): Time period for data (e.g., '1y' for 1 year)
+        interval (str): Bar size (e.g., '1d', '15m')
+        
+    Returns:
+        Series: Index returns, or None if the download failed
+    """
+    if interval in INTRADAY_INTERVALS:
+        period = MAX_PERIOD[interval]
+    
+    try:
+        data = yf.download(BENCHMARK_TICKER, period=period, interval=interval, auto_adjust=True)
+        if data.empty:
+            print("Warning: Benchmark data is empty")
+            return None
+        close = data['Close']
+        if isinstance(close, pd.DataFrame):
+            close = close.iloc[:, 0]
+        return close.pct_change().dropna()
+    except Exception as e:
+        print(f"Error fetching benchmark data: {e}")
+        return None
+
+def get_close_prices(data, verbose=False):
+    """
+    Extract split- and dividend-adjusted close prices from yfinance data
+    
+    'Adj Close' is used when the download has it. Otherwise 'Close', which
+    Yahoo already adjusts for splits, gets the dividend adjustments from the
+    corporate-action engine, and plain 'Close' is the last resort.
+    
+    Args:
+        data (DataFrame): Historical stock data
+        verbose (bool): Print which price column was used
+        
+    Returns:
+        DataFrame: Adjusted close prices, or None if no close column exists
+    """
+    multi_ticker = isinstance(data.columns, pd.MultiIndex)
+    if multi_ticker:
+        fields = set(data.columns.get_level_values(0))
+    else:
+        fields = set(data.columns)
+    
+    if verbose:
+        print(f"Available price fields: {sorted(fields)}")
+    
+    if 'Adj Close' in fields:
+        if verbose:
+            print("Using 'Adj Close' column")
+        return data['Adj Close']
+    if multi_ticker and 'Close' in fields and fields & {'Dividends', 'Stock Splits'}:
+        if verbose:
+            print("Using 'Close' adjusted for dividends")
+        events = events_from_actions(data.get('Dividends'), data.get('Stock Splits'))
+        adjusted = adjust_prices(data['Close'], events)
+        warn_split_jumps(adjusted, events)
+        return adjusted
+    if 'Close' in fields:
+        if verbose:
+            print("Using unadjusted 'Close' column")
+        return data['Close']
+    
+    print(f"Could not find closing prices. Available columns: {sorted(fields)}")
+    return None
+
 def calculate_metrics(data):
     """
     Calculate key financial metrics for the stocks
@@ -63,45 +149,10 @@ def calculate_metrics(data):
         print("No data available for metric calculation")
         return None
         
-    # Handle the DataFrame structure based on what we get from yfinance
     try:
-        # First, try to determine if we have a MultiIndex DataFrame
-        if isinstance(data.columns, pd.MultiIndex):
-            print("Working with MultiIndex DataFrame")
-            # Get first level column names
-            first_level_columns = list(data.columns.levels[0])
-            print(f"First level columns: {first_level_columns}")
-            
-            # Check what price columns are available
-            if 'Close' in first_level_columns:
-                print("Using 'Close' column")
-                close_prices = data['Close']
-            elif 'Adj Close' in first_level_columns:
-                print("Using 'Adj Close' column")
-                close_prices = data['Adj Close']
-            else:
-                print(f"Could not find closing prices. Available columns: {first_level_columns}")
-                # Try to use the first available price column
-                if len(first_level_columns) > 0:
-                    print(f"Falling back to first available column: {first_level_columns[0]}")
-                    close_prices = data[first_level_columns[0]]
-                else:
-                    return None
-        else:
-            print("Working with standard DataFrame")
-            # Handle flat DataFrame
-            columns = list(data.columns)
-            print(f"Available columns: {columns}")
-            
-            if 'Close' in columns:
-                print("Using 'Close' column")
-                close_prices = data['Close']
-            elif 'Adj Close' in columns:
-                print("Using 'Adj Close' column")
-                close_prices = data['Adj Close']
-            else:
-                print("Could not find standard closing price columns")
-                return None
+        close_prices = get_close_prices(data, verbose=True)
+        if close_prices is None:
+            return None
         
         # Calculate daily returns
         returns = close_prices.pct_change().dropna()
@@ -126,13 +177,83 @@ def calculate_metrics(data):
         traceback.print_exc()
         return None
 
-def optimize_portfolio(data, num_portfolios=1000):
+def calculate_risk_metrics(data, weights=None, benchmark=None, interval='1d'):
+    """
+    Calculate VaR/CVaR, max drawdown, Sortino and beta for every stock and
+    the optimized portfolio in one pass
+    
+    Args:
+        data (DataFrame): Historical stock data
+        weights (array): Optimal portfolio weights; adds a 'Portfolio' row
+        benchmark (Series): Index returns for beta
+        interval (str): Bar size of `data`, used to annualize the Sortino ratio
+        
+    Returns:
+        DataFrame: Risk metrics per ticker (and portfolio)
+    """
+    if data is None or data.empty:
+        print("No data available for risk metrics")
+        return None
+    
+    try:
+        close_prices = get_close_prices(data)
+        if close_prices is None:
+            return None
+        
+        returns = close_prices.pct_change().dropna()
+        return compute_risk_metrics(returns, benchmark=benchmark, weights=weights,
+                                    periods_per_year=annualization_factor(interval))
+        
+    except Exception as e:
+        print(f"Error calculating risk metrics: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def cluster_stocks(data):
+    """
+    Group stocks into correlation clusters
+    
+    Args:
+        data (DataFrame): Historical stock data
+        
+    Returns:
+        dict: Correlation matrix, linkage, leaf order and cluster labels
+    """
+    if data is None or data.empty:
+        print("No data available for clustering")
+        return None
+    
+    try:
+        close_prices = get_close_prices(data)
+        if close_prices is None:
+            return None
+        
+        returns = close_prices.pct_change().dropna()
+        return cluster_returns(returns)
+        
+    except Exception as e:
+        print(f"Error clustering stocks: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def optimize_portfolio(data, num_portfolios=1000, interval='1d', method='monte_carlo',
+                       workers=None, seed=None, sampler='dirichlet'):
     """
     Optimize portfolio allocation using Monte Carlo simulation
     
     Args:
         data (DataFrame): Historical stock data
         num_portfolios (int): Number of portfolios to simulate
+        interval (str): Bar size of `data`, used to annualize return and risk
+        method (str): 'monte_carlo' for the random search, or 'hrp' for
+            hierarchical risk parity on the correlation clusters
+        workers (int): Processes for the Monte Carlo search (default: CPU count)
+        seed (int): Seed for reproducible Monte Carlo results; seeded and
+            HRP results are cached on the price snapshot
+        sampler (str): Monte Carlo weight generator, one of
+            models.sampling.SAMPLERS
         
     Returns:
         tuple: (optimal_weights, performance_metrics)
@@ -142,31 +263,29 @@ def optimize_portfolio(data, num_portfolios=1000):
         return None, None
     
     try:
-        # Use the same logic as in calculate_metrics to get close prices
-        if isinstance(data.columns, pd.MultiIndex):
-            # Get first level column names
-            first_level_columns = list(data.columns.levels[0])
-            
-            # Check what price columns are available
-            if 'Close' in first_level_columns:
-                close_prices = data['Close']
-            elif 'Adj Close' in first_level_columns:
-                close_prices = data['Adj Close']
-            else:
-                if len(first_level_columns) > 0:
-                    close_prices = data[first_level_columns[0]]
-                else:
-                    return None, None
-        else:
-            # Handle flat DataFrame
-            columns = list(data.columns)
-            
-            if 'Close' in columns:
-                close_prices = data['Close']
-            elif 'Adj Close' in columns:
-                close_prices = data['Adj Close']
-            else:
-                return None, None
+        close_prices = get_close_prices(data)
+        if close_prices is None:
+            return None, None, None
+        
+        # Unseeded Monte Carlo runs are random by design, so only cache
+        # deterministic results
+        key = None
+        if method == 'hrp' or seed is not None:
+            # Key only on what the chosen method depends on, so MC_* settings
+            # do not invalidate HRP results
+            params = {'interval': interval, 'method': method}
+            if method != 'hrp':
+                params.update({
+                    'num_portfolios': num_portfolios,
+                    'workers': effective_workers(num_portfolios, workers),
+                    'seed': seed,
+                    'sampler': sampler,
+                })
+            key = cache_key(close_prices, params)
+            cached = load_cached(key)
+            if cached is not None:
+                print("Using cached portfolio allocation for unchanged data")
+                return cached
         
         # Extract and calculate returns
         returns = close_prices.pct_change().dropna()
@@ -177,39 +296,39 @@ def optimize_portfolio(data, num_portfolios=1000):
         
         # Number of assets
         num_assets = len(returns.columns)
+        periods_per_year = annualization_factor(interval)
         print(f"Optimizing portfolio with {num_assets} assets")
         
-        # Arrays to store results
-        results = np.zeros((3, num_portfolios))
-        weights_record = []
-        
-        # Run Monte Carlo simulation
-        for i in range(num_portfolios):
-            # Generate random weights
-            weights = np.random.random(num_assets)
-            weights /= np.sum(weights)
-            weights_record.append(weights)
-            
-            # Calculate portfolio metrics
-            portfolio_return = np.sum(mean_returns * weights) * 252
-            portfolio_std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))) * np.sqrt(252)
+        if method == 'hrp':
+            weights = hrp_weights(returns).to_numpy()
+            portfolio_return = np.sum(mean_returns * weights) * periods_per_year
+            portfolio_std_dev = np.sqrt(np.dot(weights.T, np.dot(cov_matrix, weights))) * np.sqrt(periods_per_year)
             
-            # Store results
-            results[0,i] = portfolio_std_dev
-            results[1,i] = portfolio_return
-            results[2,i] = results[1,i] / results[0,i]  # Sharpe ratio
-        
-        # Find the optimal portfolio
-        max_sharpe_idx = np.argmax(results[2])
-        optimal_weights = weights_record[max_sharpe_idx]
+            optimal_performance = {
+                'Return': portfolio_return,
+                'Risk': portfolio_std_dev,
+                'Sharpe Ratio': portfolio_return / portfolio_std_dev
+            }
+            result = (weights, optimal_performance, close_prices.columns)
+            store_cached(key, result)
+            return result
+        
+        # Run Monte Carlo simulation across worker processes
+        result = run_monte_carlo(mean_returns, cov_matrix, num_portfolios,
+                                 periods_per_year=periods_per_year,
+                                 workers=workers, seed=seed, sampler=sampler)
+        optimal_weights = result['weights']
         
         # Get performance metrics for the optimal portfolio
         optimal_performance = {
-            'Return': results[1, max_sharpe_idx],
-            'Risk': results[0, max_sharpe_idx],
-            'Sharpe Ratio': results[2, max_sharpe_idx]
+            'Return': result['Return'],
+            'Risk': result['Risk'],
+            'Sharpe Ratio': result['Sharpe Ratio']
         }
         
+        if key is not None:
+            store_cached(key, (optimal_weights, optimal_performance, close_prices.columns))
+        
         return optimal_weights, optimal_performance, close_prices.columns
         
     except Exception as e:
@@ -218,7 +337,7 @@ def optimize_portfolio(data, num_portfolios=1000):
         traceback.print_exc()
         return None, None, None
 
-def save_processed_data(metrics, optimal_weights, tickers):
+def save_processed_data(metrics, optimal_weights, tickers, clusters=None):
     """
     Save processed data to CSV file
     
@@ -226,6 +345,7 @@ def save_processed_data(metrics, optimal_weights, tickers):
         metrics (DataFrame): Financial metrics
         optimal_weights (array): Optimal portfolio weights
         tickers (Index): Stock tickers
+        clusters (dict): Output of cluster_stocks; adds a 'Cluster' column
         
     Returns:
         bool: True if data was saved successfully, False otherwise
@@ -247,6 +367,8 @@ def save_processed_data(metrics, optimal_weights, tickers):
         # Combine metrics and weights into a single processed DataFrame
         processed = metrics.copy()
         processed['Weight'] = pd.Series(optimal_weights, index=tickers)
+        if clusters is not None:
+            processed['Cluster'] = clusters['labels']
         
         # Save processed data
         processed.to_csv('data/processed.csv')
@@ -295,10 +417,26 @@ def run_recommendations():
         print(f"Error running recommendations script: {e}")
         return False
 
-def main():
+def run_workflow(interval=None, method=None, run=None):
     """
-    Main function to run the stock analysis workflow
+    Run the stock analysis workflow stage by stage
+    
+    Args:
+        interval (str): Bar size to analyze; defaults to the STOCK_INTERVAL
+            environment variable, then '1d'
+        method (str): Portfolio optimizer; defaults to the PORTFOLIO_METHOD
+            environment variable, then 'monte_carlo'
+        run (dict): Profiling run from modules.profiling.start_run, or None
     """
+    if interval is None:
+        interval = os.environ.get('STOCK_INTERVAL', '1d')
+    if method is None:
+        method = os.environ.get('PORTFOLIO_METHOD', 'monte_carlo')
+    num_portfolios = int(os.environ.get('MC_PORTFOLIOS', 1000))
+    workers = int(os.environ['MC_WORKERS']) if os.environ.get('MC_WORKERS') else None
+    seed = int(os.environ['MC_SEED']) if os.environ.get('MC_SEED') else None
+    sampler = os.environ.get('MC_SAMPLER', 'dirichlet')
+    
     print("NIFTY 50 Stock Analysis and Portfolio Allocation")
     print("------------------------------------------------")
     
@@ -311,15 +449,20 @@ def main():
     
     # Fetch data
     print("Fetching NIFTY 50 stock data...")
-    data = fetch_nifty50_data()
+    with stage(run, 'fetch'):
+        data = fetch_nifty50_data(interval=interval)
     
     if data is None or data.empty:
         print("Failed to obtain stock data. Exiting.")
         return
     
+    with stage(run, 'fetch_benchmark'):
+        benchmark = fetch_benchmark_returns(interval=interval)
+    
     # Calculate metrics
     print("Calculating financial metrics...")
-    metrics = calculate_metrics(data)
+    with stage(run, 'metrics'):
+        metrics = calculate_metrics(data)
     if metrics is not None:
         print("\nFinancial Metrics:")
         print(metrics)
@@ -327,9 +470,24 @@ def main():
         print("Failed to calculate metrics. Exiting.")
         return
     
+    # Cluster correlated stocks
+    print("\nClustering correlated stocks...")
+    with stage(run, 'clustering'):
+        clusters = cluster_stocks(data)
+    if clusters is not None:
+        for label, members in clusters['labels'].groupby(clusters['labels']):
+            if len(members) > 1:
+                print(f"Cluster {label}: {', '.join(members.index)}")
+        split = split_tickers(clusters['labels'])
+        if split:
+            print(f"Warning: banks are split across clusters {split}; the Buy cap will not see them as correlated")
+    
     # Optimize portfolio
     print("\nOptimizing portfolio allocation...")
-    weights, performance, tickers = optimize_portfolio(data)
+    with stage(run, 'optimize'):
+        weights, performance, tickers = optimize_portfolio(data, num_portfolios, interval=interval,
+                                                        method=method, workers=workers, seed=seed,
+                                                        sampler=sampler)
     
     if weights is not None and performance is not None:
         # Display results
@@ -341,14 +499,38 @@ def main():
         print("\nOptimal Portfolio Weights:")
         for i, ticker in enumerate(tickers):
             print(f"{ticker}: {weights[i]:.4f}")
+        
+        # Risk metrics for every stock and the optimized portfolio
+        with stage(run, 'risk'):
+            risk = calculate_risk_metrics(data, weights, benchmark, interval)
+        if risk is not None:
+            print("\nOptimal Portfolio Risk:")
+            for name, value in risk.loc[PORTFOLIO_LABEL].items():
+                print(f"{name}: {value:.4f}")
+            metrics = metrics.join(risk.drop(index=PORTFOLIO_LABEL))
             
         # Save processed data
-        save_processed_data(metrics, weights, tickers)
+        with stage(run, 'save'):
+            save_processed_data(metrics, weights, tickers, clusters)
         
         # Run recommendations script
-        run_recommendations()
+        with stage(run, 'recommendations'):
+            run_recommendations()
     else:
         print("Failed to optimize portfolio.")
 
+def main(interval=None, method=None):
+    """
+    Main function to run the stock analysis workflow
+    
+    Pass --profile or set STOCK_PROFILE=1 to write per-stage cProfile dumps
+    and a hot-function summary under data/profiles.
+    """
+    run = start_run('app')
+    try:
+        run_workflow(interval, method, run)
+    finally:
+        write_summary(run)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+API Load Test
+Replays queries against the stock API from concurrent clients and reports latency
+"""
+
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+DEFAULT_PATHS = [
+    '/top?risk=low&k=5',
+    '/top?risk=high&k=10',
+    '/allocation?amount=100000&risk=medium',
+    '/signals?signal=Buy',
+]
+
+
+async def _get(reader, writer, host, path):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+
+    status = await reader.readline()
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status.split()[1] == b'200'
+
+
+async def client(host, port, paths, requests, latencies):
+    # Each client reuses one keep-alive connection, as a dashboard would
+    reader, writer = await asyncio.open_connection(host, port)
+    errors = 0
+    try:
+        for i in range(requests):
+            start = time.perf_counter()
+            ok = await _get(reader, writer, host, paths[i % len(paths)])
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+    finally:
+        writer.close()
+    return errors
+
+
+async def run(host, port, clients, requests, paths):
+    latencies = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(client(host, port, paths, requests, latencies)
+                                    for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    print(f"Requests: {len(ms)} from {clients} clients in {elapsed:.2f}s "
+          f"({len(ms) / elapsed:.0f} req/s), errors: {sum(errors)}")
+    print(f"p50: {np.percentile(ms, 50):.2f} ms")
+    print(f"p99: {np.percentile(ms, 99):.2f} ms")
+    print(f"max: {ms.max():.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the stock query API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--clients', type=int, default=50, help="concurrent connections")
+    parser.add_argument('--requests', type=int, default=200, help="requests per client")
+    parser.add_argument('--path', action='append', dest='paths',
+                        help="request path to replay (repeatable)")
+    args = parser.parse_args()
+
+    asyncio.run(run(args.host, args.port, args.clients, args.requests,
+                    args.paths or DEFAULT_PATHS))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from models.sampling import DEFAULT_SPARSE_K, make_sampler
+
+# Portfolios evaluated per vectorized step inside a worker
+BATCH_SIZE = 10_000
+# Below this many portfolios per worker a process pool costs more than it saves
+MIN_PER_WORKER = 50_000
+
+
+def _evaluate(weights, mean_returns, cov_matrix, periods_per_year):
+    portfolio_return = weights @ mean_returns * periods_per_year
+    variance = np.einsum("ij,ij->i", weights @ cov_matrix, weights)
+    portfolio_std_dev = np.sqrt(variance * periods_per_year)
+    return portfolio_return, portfolio_std_dev, portfolio_return / portfolio_std_dev
+
+
+def _search(task):
+    """
+    Evaluate one worker's share of random portfolios.
+
+    Only the running best and, if requested, a top-k min-heap are kept, so
+    memory does not grow with the number of portfolios.
+    """
+    (worker, count, seed, mean_returns, cov_matrix, periods_per_year, top_k,
+     sampler, sparse_k) = task
+    draw = make_sampler(sampler, len(mean_returns), seed=seed, sparse_k=sparse_k)
+
+    best = None
+    top = []
+    done = 0
+    while done < count:
+        n = min(BATCH_SIZE, count - done)
+        weights = draw(n)
+        ret, risk, sharpe = _evaluate(weights, mean_returns, cov_matrix, periods_per_year)
+
+        i = int(np.argmax(sharpe))
+        if best is None or sharpe[i] > best[0]:
+            best = (sharpe[i], ret[i], risk[i], weights[i].copy())
+
+        if top_k:
+            k = min(top_k, n)
+            for j in np.argpartition(-sharpe, k - 1)[:k]:
+                # (worker, sample index) breaks ties without comparing arrays
+                entry = (sharpe[j], worker, done + int(j), ret[j], risk[j], weights[j].copy())
+                if len(top) < top_k:
+                    heapq.heappush(top, entry)
+                elif entry[:3] > top[0][:3]:
+                    heapq.heapreplace(top, entry)
+        done += n
+
+    return worker, best, top
+
+
+def _split(total, parts):
+    base, extra = divmod(total, parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def effective_workers(num_portfolios, workers=None):
+    """Processes run_monte_carlo actually uses for `num_portfolios`."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, num_portfolios // MIN_PER_WORKER))
+
+
+def run_monte_carlo(mean_returns, cov_matrix, num_portfolios, periods_per_year=252,
+                    workers=None, seed=None, top_k=0, sampler="dirichlet",
+                    sparse_k=DEFAULT_SPARSE_K):
+    """
+    Random-weight portfolio search split across a process pool.
+
+    Every worker draws from its own stream spawned from `seed`, so the
+    result is identical for a given seed and worker count. `sampler` picks
+    the weight generator from models.sampling.
+
+    Returns:
+        dict: 'weights', 'Return', 'Risk', 'Sharpe Ratio' of the best
+        portfolio and 'top', a list of the best `top_k` as
+        (sharpe, return, risk, weights) in descending Sharpe order
+    """
+    if num_portfolios <= 0:
+        raise ValueError(f"num_portfolios must be positive, got {num_portfolios}")
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+
+    workers = effective_workers(num_portfolios, workers)
+
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    tasks = [
+        (i, count, seeds[i], mean_returns, cov_matrix, periods_per_year, top_k,
+         sampler, sparse_k)
+        for i, count in enumerate(_split(num_portfolios, workers))
+    ]
+
+    if workers == 1:
+        results = [_search(tasks[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_search, tasks))
+
+    # Reduce in worker order so ties resolve the same way on every run
+    best = None
+    for _, worker_best, _ in sorted(results, key=lambda r: r[0]):
+        if worker_best is not None and (best is None or worker_best[0] > best[0]):
+            best = worker_best
+
+    merged = heapq.nlargest(top_k, (e for _, _, top in results for e in top),
+                            key=lambda e: e[:3]) if top_k else []
+
+    sharpe, ret, risk, weights = best
+    return {
+        'weights': weights,
+        'Return': ret,
+        'Risk': risk,
+        'Sharpe Ratio': sharpe,
+        'top': [(e[0], e[3], e[4], e[5]) for e in merged],
+    }
@@ -1,5 +1,6 @@
 import pandas as pd
 import numpy as np
+from modules.clustering import cluster_returns
 
 def allocate_portfolio(amount, stocks):
     allocation = {}
@@ -11,6 +12,34 @@ def allocate_portfolio(amount, stocks):
 
     return allocation
 
+def _cluster_variance(cov, idx):
+    # Variance of an inverse-variance weighted sub-portfolio
+    sub = cov[np.ix_(idx, idx)]
+    ivp = 1 / np.diag(sub)
+    ivp /= ivp.sum()
+    return ivp @ sub @ ivp
+
+def hrp_weights(returns, clusters=None):
+    """Hierarchical risk parity weights from recursive bisection of the dendrogram."""
+    if clusters is None:
+        clusters = cluster_returns(returns)
+    cov = returns.cov().to_numpy()
+    order = returns.columns.get_indexer(clusters["order"])
+
+    weights = np.ones(len(order))
+    groups = [order]
+    while groups:
+        groups = [g[s] for g in groups if len(g) > 1
+                  for s in (slice(0, len(g) // 2), slice(len(g) // 2, None))]
+        for left, right in zip(groups[::2], groups[1::2]):
+            var_left = _cluster_variance(cov, left)
+            var_right = _cluster_variance(cov, right)
+            alpha = 1 - var_left / (var_left + var_right)
+            weights[left] *= alpha
+            weights[right] *= 1 - alpha
+
+    return pd.Series(weights, index=returns.columns)
+
 if __name__ == "__main__":
     top_stocks = pd.read_csv("data/processed_data.csv", index_col=0).head(5)
     print(allocate_portfolio(100000, top_stocks))
@@ -0,0 +1,102 @@
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.stats import qmc
+
+SAMPLERS = ("uniform", "dirichlet", "sobol", "halton", "sparse")
+DEFAULT_SPARSE_K = 5
+
+
+def _to_simplex(points):
+    # -log of uniform points is exponential, and normalized exponentials
+    # are uniformly distributed on the simplex (Dirichlet(1, ..., 1))
+    spacings = -np.log(np.clip(points, 1e-12, 1.0))
+    return spacings / spacings.sum(axis=1, keepdims=True)
+
+
+def make_sampler(method, num_assets, seed=None, sparse_k=DEFAULT_SPARSE_K):
+    """
+    Weight generator for the Monte Carlo search.
+
+    Args:
+        method (str): 'uniform' (normalized uniform draws, the original
+            non-uniform scheme), 'dirichlet' (uniform on the simplex),
+            'sobol' / 'halton' (scrambled low-discrepancy points mapped to
+            the simplex) or 'sparse' (uniform weights on `sparse_k` random assets)
+        num_assets (int): Number of assets
+        seed: Seed or SeedSequence for the random stream / scrambling
+
+    Returns:
+        callable: draw(n) -> (n, num_assets) array of long-only weights
+    """
+    rng = np.random.default_rng(seed)
+
+    if method == "uniform":
+        def draw(n):
+            weights = rng.random((n, num_assets))
+            return weights / weights.sum(axis=1, keepdims=True)
+    elif method == "dirichlet":
+        def draw(n):
+            return rng.dirichlet(np.ones(num_assets), size=n)
+    elif method in ("sobol", "halton"):
+        engine_cls = qmc.Sobol if method == "sobol" else qmc.Halton
+        engine = engine_cls(d=num_assets, scramble=True, seed=rng)
+
+        def draw(n):
+            with warnings.catch_warnings():
+                # Sobol prefers powers of two; any batch size is still valid
+                warnings.simplefilter("ignore", UserWarning)
+                return _to_simplex(engine.random(n))
+    elif method == "sparse":
+        k = min(sparse_k, num_assets)
+
+        def draw(n):
+            chosen = np.argpartition(rng.random((n, num_assets)), k - 1, axis=1)[:, :k]
+            weights = np.zeros((n, num_assets))
+            np.put_along_axis(weights, chosen, rng.dirichlet(np.ones(k), size=n), axis=1)
+            return weights
+    else:
+        raise ValueError(f"Unknown sampler '{method}', expected one of {', '.join(SAMPLERS)}")
+
+    return draw
+
+
+def convergence_report(mean_returns, cov_matrix, sample_counts=(1_000, 10_000, 100_000),
+                       methods=SAMPLERS, periods_per_year=252, seed=0,
+                       sparse_k=DEFAULT_SPARSE_K, batch_size=10_000):
+    """
+    Best Sharpe ratio found by each sampler after each sample count.
+
+    Returns:
+        DataFrame: One row per sample count, one column per method
+    """
+    mean_returns = np.asarray(mean_returns, dtype=float)
+    cov_matrix = np.asarray(cov_matrix, dtype=float)
+    checkpoints = sorted(int(c) for c in sample_counts)
+
+    report = {}
+    for method in methods:
+        draw = make_sampler(method, len(mean_returns), seed=seed, sparse_k=sparse_k)
+        best = -np.inf
+        done = 0
+        column = {}
+        for checkpoint in checkpoints:
+            while done < checkpoint:
+                weights = draw(min(batch_size, checkpoint - done))
+                ret = weights @ mean_returns * periods_per_year
+                risk = np.sqrt(np.einsum("ij,ij->i", weights @ cov_matrix, weights) * periods_per_year)
+                best = max(best, float(np.max(ret / risk)))
+                done += len(weights)
+            column[checkpoint] = best
+        report[method] = column
+
+    frame = pd.DataFrame(report)
+    frame.index.name = "Samples"
+    return frame
+
+
+if __name__ == "__main__":
+    from modules.adjustments import load_adjusted_prices
+
+    returns = load_adjusted_prices().pct_change().dropna()
+    print(convergence_report(returns.mean(), returns.cov()).round(4))
@@ -0,0 +1,224 @@
+import os
+import numpy as np
+import pandas as pd
+from modules.resampler import MARKET_TZ, price_path, read_price_chunks, resample_stream
+
+EVENTS_PATH = "data/corporate_actions.csv"
+EVENT_COLUMNS = ["Date", "Ticker", "Type", "Value"]
+FETCH_COLUMNS = ["End", "Fetched"]
+
+
+def events_from_actions(dividends=None, splits=None):
+    """
+    Build the event table from wide yfinance action frames (date x ticker).
+
+    Dividends are cash per share; splits are the new/old share ratio, so a
+    2-for-1 split is stored as 2.0.
+    """
+    frames = []
+    for kind, actions in (("dividend", dividends), ("split", splits)):
+        if actions is None or actions.empty:
+            continue
+        stacked = actions.stack()
+        stacked = stacked[stacked.fillna(0) != 0]
+        if stacked.empty:
+            continue
+        frames.append(pd.DataFrame({
+            "Date": _session_dates(stacked.index.get_level_values(0)).strftime("%Y-%m-%d"),
+            "Ticker": stacked.index.get_level_values(1),
+            "Type": kind,
+            "Value": stacked.values.astype(float),
+        }))
+    if not frames:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_events(path=EVENTS_PATH):
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+    return pd.read_csv(path)
+
+
+def append_events(events, path=EVENTS_PATH):
+    """Merge new events into the event table; the price store is untouched."""
+    merged = pd.concat([load_events(path), events], ignore_index=True)
+    merged = merged.drop_duplicates(subset=["Date", "Ticker", "Type"], keep="last")
+    merged = merged.sort_values(["Date", "Ticker"])
+    merged.to_csv(path, index=False)
+    return merged
+
+
+def fetch_log_path(path):
+    """Fetch log kept next to an append-only intraday store."""
+    root, ext = os.path.splitext(path)
+    return f"{root}_fetches{ext}"
+
+
+def record_fetch(path, end, fetched=None):
+    """
+    Log that the store at `path` now holds bars up to `end`, as downloaded
+    at `fetched`. A missing fetch time marks bars of unknown basis.
+    """
+    log_path = fetch_log_path(path)
+    row = pd.DataFrame({"End": [str(end)], "Fetched": ["" if fetched is None else str(fetched)]})
+    row.to_csv(log_path, mode="a", header=not os.path.exists(log_path), index=False)
+
+
+def load_fetch_log(path):
+    log_path = fetch_log_path(path)
+    if not os.path.exists(log_path):
+        return pd.DataFrame(columns=FETCH_COLUMNS)
+    log = pd.read_csv(log_path)
+    for column in FETCH_COLUMNS:
+        log[column] = pd.to_datetime(log[column], utc=True).dt.tz_convert(MARKET_TZ)
+    return log
+
+
+def _session_dates(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_convert(MARKET_TZ).tz_localize(None)
+    return index.normalize()
+
+
+def _events_in_window(prices, events):
+    """Events that fall inside the price window, with their row/column positions."""
+    events = events[events["Ticker"].isin(prices.columns)]
+    dates = _session_dates(prices.index)
+    rows = dates.searchsorted(pd.to_datetime(events["Date"]).values, side="left")
+    cols = prices.columns.get_indexer(events["Ticker"])
+
+    # Ex-dates outside the window leave every bar on the same basis
+    inside = (rows > 0) & (rows < len(dates))
+    return events[inside], rows[inside], cols[inside]
+
+
+def adjustment_factors(prices, events, include_splits=False):
+    """
+    Cumulative back-adjustment factor for every stored close.
+
+    Each event contributes a multiplier on its ex-date (1 - dividend/previous
+    close for a dividend, 1/ratio for a split); the factor for a bar is the
+    product of the multipliers of all later ex-dates.
+
+    Yahoo's 'Close' (including history(auto_adjust=False)) is already split
+    adjusted and only leaves dividends out, so splits are skipped by default
+    and kept in the event table for bookkeeping. Pass include_splits=True
+    only for closes that are genuinely unadjusted for splits.
+    """
+    multipliers = np.ones(prices.shape)
+    if events is not None and not events.empty:
+        if not include_splits:
+            events = events[events["Type"] != "split"]
+        events, rows, cols = _events_in_window(prices, events)
+        values = events["Value"].to_numpy(dtype=float)
+        is_split = (events["Type"] == "split").to_numpy()
+
+        raw = prices.to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            event_mult = np.where(is_split, 1.0 / values, 1.0 - values / raw[rows - 1, cols])
+        event_mult = np.where(np.isfinite(event_mult) & (event_mult > 0), event_mult, 1.0)
+        np.multiply.at(multipliers, (rows, cols), event_mult)
+
+    later = np.cumprod(multipliers[::-1], axis=0)[::-1]
+    factors = np.ones(prices.shape)
+    factors[:-1] = later[1:]
+    return pd.DataFrame(factors, index=prices.index, columns=prices.columns)
+
+
+def adjust_prices(prices, events, include_splits=False):
+    return prices * adjustment_factors(prices, events, include_splits=include_splits)
+
+
+def stored_split_factors(index, columns, events, fetches):
+    """
+    Split factors for intraday bars still on their pre-split basis.
+
+    Each fetch returns its whole window on the current basis, but
+    append_bars keeps the bars of earlier fetches as they were. A bar dated
+    before a split's ex-date that was also fetched before it therefore
+    still needs 1/ratio. Bars without a logged fetch time are left alone.
+    """
+    factors = np.ones((len(index), len(columns)))
+    if events is None or events.empty or fetches.empty:
+        return factors
+    splits = events[(events["Type"] == "split") & events["Ticker"].isin(columns)]
+    if splits.empty:
+        return factors
+
+    # Each bar was written by the first fetch whose block ends at or after it
+    ends = pd.DatetimeIndex(fetches["End"])
+    block = ends.searchsorted(pd.DatetimeIndex(index).tz_convert(ends.tz), side="left")
+    fetched = pd.DatetimeIndex(fetches["Fetched"]).append(pd.DatetimeIndex([pd.NaT], tz=ends.tz))
+    fetch_dates = _session_dates(fetched[np.minimum(block, len(fetches))])
+    bar_dates = _session_dates(index)
+
+    cols = pd.Index(columns).get_indexer(splits["Ticker"])
+    for ex_date, col, ratio in zip(pd.to_datetime(splits["Date"]), cols, splits["Value"].astype(float)):
+        stale = (bar_dates < ex_date) & (fetch_dates < ex_date)
+        if ratio > 0:
+            factors[stale, col] /= ratio
+    return factors
+
+
+def adjust_stored_splits(chunks, events, fetches):
+    """Bring every chunk of an intraday store onto the current split basis."""
+    for chunk in chunks:
+        yield chunk * stored_split_factors(chunk.index, chunk.columns, events, fetches)
+
+
+def split_jumps(prices, events, tolerance=0.5):
+    """
+    Split events where the adjusted series still jumps on the ex-date.
+
+    A move of at least `tolerance` times the split's log ratio in either
+    direction means the split was either never applied or applied twice.
+
+    Returns:
+        DataFrame: The offending split events with the observed 'Return'
+    """
+    if events is None or events.empty:
+        return pd.DataFrame(columns=EVENT_COLUMNS + ["Return"])
+    splits, rows, cols = _events_in_window(prices, events[events["Type"] == "split"])
+    ratios = splits["Value"].to_numpy(dtype=float)
+
+    adjusted = prices.to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = adjusted[rows, cols] / adjusted[rows - 1, cols]
+        jump = np.abs(np.log(returns)) >= tolerance * np.abs(np.log(ratios))
+    flagged = splits[jump].copy()
+    flagged["Return"] = returns[jump] - 1
+    return flagged
+
+
+def warn_split_jumps(prices, events):
+    flagged = split_jumps(prices, events)
+    for _, event in flagged.iterrows():
+        print(f"Warning: {event['Ticker']} moves {event['Return']:+.1%} on its "
+              f"{event['Value']:g}:1 split ex-date {event['Date']}; check the split adjustment")
+    return flagged
+
+
+def load_adjusted_prices(path=None, events_path=EVENTS_PATH):
+    """Read stored daily closes and apply the corporate-action adjustments."""
+    prices = pd.read_csv(path or price_path("1d"), index_col=0, parse_dates=True)
+    events = load_events(events_path)
+    adjusted = adjust_prices(prices, events)
+    warn_split_jumps(adjusted, events)
+    return adjusted
+
+
+def load_adjusted_resampled(path, rule="1D", events_path=EVENTS_PATH):
+    """
+    Stream an intraday store, put stale bars on the current split basis,
+    resample to `rule` bars and apply the dividend adjustments.
+    """
+    events = load_events(events_path)
+    chunks = adjust_stored_splits(read_price_chunks(path), events, load_fetch_log(path))
+    bars = list(resample_stream(chunks, rule))
+    if not bars:
+        return pd.DataFrame()
+    adjusted = adjust_prices(pd.concat(bars), events)
+    warn_split_jumps(adjusted, events)
+    return adjusted
@@ -0,0 +1,85 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+from scipy.spatial.distance import squareform
+
+# Tickers whose average correlation is above this end up in one cluster.
+# Daily NIFTY bank returns correlate around 0.35-0.65, so a higher cut
+# leaves HDFCBANK, ICICIBANK and SBIN in separate clusters
+MIN_CLUSTER_CORRELATION = 0.3
+
+# Large banks that should share a cluster on any reasonable snapshot
+BANK_TICKERS = ["HDFCBANK.NS", "ICICIBANK.NS", "AXISBANK.NS", "SBIN.NS", "INDUSINDBK.NS"]
+
+_CACHE = {}
+_CACHE_SIZE = 8
+
+
+def snapshot_key(returns):
+    """Content hash of a returns frame, used to reuse clustering per snapshot."""
+    digest = hashlib.sha1()
+    digest.update(",".join(map(str, returns.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(returns, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def correlation_distance(corr):
+    # Proper metric on correlations: 0 for identical, 1 for opposite series
+    return np.sqrt(np.clip(0.5 * (1 - corr), 0.0, 1.0))
+
+
+def cluster_returns(returns, min_correlation=MIN_CLUSTER_CORRELATION):
+    """
+    Correlation matrix, hierarchical linkage and flat cluster labels.
+
+    The result is cached on the returns snapshot, so recommendations and
+    the HRP allocator share one clustering of the same data.
+
+    Returns:
+        dict: 'correlation' (DataFrame), 'linkage' (ndarray), 'order'
+        (tickers in dendrogram leaf order) and 'labels' (Series of cluster ids)
+    """
+    key = (snapshot_key(returns), min_correlation)
+    if key in _CACHE:
+        return _CACHE[key]
+
+    corr = returns.corr().fillna(0.0)
+    dist = correlation_distance(corr.to_numpy())
+    np.fill_diagonal(dist, 0.0)
+    link = linkage(squareform(dist, checks=False), method="average")
+
+    cutoff = correlation_distance(min_correlation)
+    labels = fcluster(link, t=cutoff, criterion="distance")
+
+    result = {
+        "correlation": corr,
+        "linkage": link,
+        "order": corr.index[leaves_list(link)].tolist(),
+        "labels": pd.Series(labels, index=corr.index, name="Cluster"),
+    }
+
+    if len(_CACHE) >= _CACHE_SIZE:
+        _CACHE.pop(next(iter(_CACHE)))
+    _CACHE[key] = result
+    return result
+
+
+def split_tickers(labels, tickers=BANK_TICKERS):
+    """Cluster label of each of `tickers` if they do not all share one, else None."""
+    present = labels.reindex(tickers).dropna()
+    if present.nunique() > 1:
+        return present.astype(int).to_dict()
+    return None
+
+
+if __name__ == "__main__":
+    prices = pd.read_csv("data/nifty50_data.csv", index_col=0)
+    labels = cluster_returns(prices.pct_change().dropna())["labels"]
+    for label, members in labels.groupby(labels):
+        print(f"Cluster {label}: {', '.join(members.index)}")
+
+    split = split_tickers(labels)
+    if split:
+        raise SystemExit(f"Banks are split across clusters: {split}")
+    print("Banks share one cluster")
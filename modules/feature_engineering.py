@@ -1,22 +1,45 @@
+import os
 import pandas as pd
 import numpy as np
+from modules.resampler import INTRADAY_INTERVALS, RESAMPLE_RULES, annualization_factor, price_path
+from modules.adjustments import load_adjusted_prices, load_adjusted_resampled
+from modules.risk_metrics import compute_risk_metrics
 
-def compute_indicators():
-    df = pd.read_csv("data/nifty50_data.csv", index_col=0, parse_dates=True)
+INDICATOR_RISK_COLUMNS = ["VaR", "CVaR", "Max Drawdown", "Sortino Ratio"]
+
+def load_daily_prices(interval="1d"):
+    # Intraday stores are streamed and collapsed to daily closes so the
+    # SMA windows below keep meaning trading days
+    if interval in INTRADAY_INTERVALS:
+        return load_adjusted_resampled(price_path(interval), rule=RESAMPLE_RULES["1d"])
+    return load_adjusted_prices()
+
+def compute_indicators(interval="1d"):
+    df = load_daily_prices(interval)
     
     indicators = {}
     for col in df.columns:
         data = df[col].dropna()
         indicators[col] = {
-            "1Y_Return": (data[-1] - data[0]) / data[0] * 100,
-            "Volatility": np.std(data.pct_change()) * np.sqrt(252),
+            "1Y_Return": (data.iloc[-1] - data.iloc[0]) / data.iloc[0] * 100,
+            "Volatility": np.std(data.pct_change()) * np.sqrt(annualization_factor("1d")),
             "SMA_50": data.rolling(50).mean().iloc[-1],
             "SMA_200": data.rolling(200).mean().iloc[-1],
         }
     
     indicator_df = pd.DataFrame(indicators).T
+    
+    # Weekly bars (Friday closes) give a second, lower-frequency volatility
+    # estimate that is less sensitive to day-to-day noise
+    weekly = df.resample(RESAMPLE_RULES["1wk"]).last().dropna(how="all")
+    indicator_df["Weekly_Volatility"] = weekly.pct_change().std() * np.sqrt(annualization_factor("1wk"))
+    
+    # Tail and downside risk for all tickers at once, under the risk engine's
+    # column names so processed_data.csv and app.py's processed.csv agree
+    risk = compute_risk_metrics(df.pct_change().iloc[1:], periods_per_year=annualization_factor("1d"))
+    indicator_df = indicator_df.join(risk[INDICATOR_RISK_COLUMNS])
     indicator_df.to_csv("data/processed_data.csv")
     print("Indicators computed and saved.")
 
 if __name__ == "__main__":
-    compute_indicators()
+    compute_indicators(interval=os.environ.get("STOCK_INTERVAL", "1d"))
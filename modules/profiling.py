@@ -0,0 +1,108 @@
+import cProfile
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+PROFILE_ENV = "STOCK_PROFILE"
+PROFILE_FLAG = "--profile"
+PROFILE_DIR = "data/profiles"
+TOP_FUNCTIONS = 10
+
+
+def profiling_enabled():
+    """True when run with --profile or with STOCK_PROFILE set to a truthy value."""
+    if PROFILE_FLAG in sys.argv:
+        return True
+    return os.environ.get(PROFILE_ENV, "").lower() not in ("", "0", "false", "no")
+
+
+def start_run(name, output_dir=PROFILE_DIR):
+    """
+    Begin a profiled pipeline run, or return None when profiling is off.
+
+    Child processes started afterwards (e.g. recommendations.py from app.py)
+    inherit STOCK_PROFILE and profile themselves into their own run directory.
+    """
+    if not profiling_enabled():
+        return None
+    os.environ[PROFILE_ENV] = "1"
+    run_dir = os.path.join(output_dir, f"{name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    os.makedirs(run_dir, exist_ok=True)
+    print(f"Profiling enabled, writing to {run_dir}")
+    return {"name": name, "dir": run_dir, "stages": []}
+
+
+@contextmanager
+def stage(run, name):
+    """
+    Profile one pipeline stage with cProfile and track its peak allocation.
+
+    A no-op when `run` is None. Work done in pool worker processes is not
+    captured, only the time the stage spends waiting on it.
+    """
+    if run is None:
+        yield
+        return
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+
+        index = len(run["stages"]) + 1
+        dump_path = os.path.join(run["dir"], f"{index:02d}_{name}.prof")
+        profiler.dump_stats(dump_path)
+        run["stages"].append({
+            "name": name,
+            "seconds": elapsed,
+            "peak_mb": peak / 2**20,
+            "stats": pstats.Stats(profiler),
+            "dump": dump_path,
+        })
+
+
+def _hot_functions(stats, limit):
+    rows = []
+    for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        rows.append((tottime, cumtime, ncalls, f"{os.path.basename(filename)}:{line}({func})"))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def write_summary(run, top_n=TOP_FUNCTIONS):
+    """Write and print the per-stage table and each stage's hottest functions."""
+    if run is None or not run["stages"]:
+        return None
+
+    lines = [f"Profile summary: {run['name']}", ""]
+    lines.append(f"{'Stage':<24}{'Seconds':>10}{'Peak MB':>10}")
+    for s in run["stages"]:
+        lines.append(f"{s['name']:<24}{s['seconds']:>10.3f}{s['peak_mb']:>10.1f}")
+
+    for s in run["stages"]:
+        lines += ["", f"Top functions in {s['name']} (by own time):"]
+        lines.append(f"{'tottime':>10}{'cumtime':>10}{'calls':>10}  function")
+        for tottime, cumtime, ncalls, where in _hot_functions(s["stats"], top_n):
+            lines.append(f"{tottime:>10.4f}{cumtime:>10.4f}{ncalls:>10}  {where}")
+
+    summary = "\n".join(lines) + "\n"
+    path = os.path.join(run["dir"], "summary.txt")
+    with open(path, "w") as f:
+        f.write(summary)
+    print(summary)
+    print(f"Profile dumps and summary saved to {run['dir']}")
+    return path
@@ -0,0 +1,71 @@
+import pandas as pd
+
+# NSE cash session runs 09:15-15:30 IST, i.e. 375 one-minute bars a day
+MARKET_TZ = "Asia/Kolkata"
+TRADING_DAYS = 252
+BARS_PER_DAY = {"1m": 375, "5m": 75, "15m": 25, "1d": 1}
+INTRADAY_INTERVALS = ("1m", "5m", "15m")
+
+# yfinance only serves a limited lookback for intraday bars
+MAX_PERIOD = {"1m": "7d", "5m": "60d", "15m": "60d"}
+
+RESAMPLE_RULES = {"1d": "1D", "1wk": "W-FRI"}
+
+
+def annualization_factor(interval="1d"):
+    """Number of bars of the given interval in a trading year."""
+    if interval == "1wk":
+        return 52
+    if interval not in BARS_PER_DAY:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return TRADING_DAYS * BARS_PER_DAY[interval]
+
+
+def price_path(interval="1d"):
+    """Location of the close-price store for an interval."""
+    if interval == "1d":
+        return "data/nifty50_data.csv"
+    return f"data/nifty50_data_{interval}.csv"
+
+
+def _to_market_time(index):
+    return pd.to_datetime(index, utc=True).tz_convert(MARKET_TZ)
+
+
+def read_price_chunks(path, chunksize=100_000):
+    """Yield the close-price store in chunks of rows, indexed in market time."""
+    for chunk in pd.read_csv(path, index_col=0, chunksize=chunksize):
+        chunk.index = _to_market_time(chunk.index)
+        yield chunk
+
+
+def resample_stream(chunks, rule="1D"):
+    """
+    Resample a stream of close-price chunks to coarser bars.
+
+    Only the last, possibly incomplete, bar is carried between chunks, so
+    memory stays bounded by the chunk size rather than the history length.
+    """
+    pending = None
+    for chunk in chunks:
+        bars = chunk.resample(rule).last()
+        if pending is not None:
+            # groupby().last() keeps the latest non-null close per column,
+            # the same rule resample().last() applies within a chunk
+            bars = pd.concat([pending, bars]).groupby(level=0).last()
+        pending = bars.iloc[-1:]
+        done = bars.iloc[:-1].dropna(how="all")
+        if not done.empty:
+            yield done
+    if pending is not None:
+        pending = pending.dropna(how="all")
+        if not pending.empty:
+            yield pending
+
+
+def last_timestamp(path):
+    """Latest timestamp in a price store, reading only the index column."""
+    index = pd.read_csv(path, usecols=[0], index_col=0).index
+    if len(index) == 0:
+        return None
+    return _to_market_time(index).max()
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import os
+import pickle
+import pandas as pd
+
+CACHE_DIR = "data/cache"
+MAX_CACHE_BYTES = 50 * 1024 * 1024
+
+
+def cache_key(source, params=None):
+    """
+    Content address for a computation.
+
+    Args:
+        source: Path of the input artifact, or a DataFrame already in memory
+        params (dict): Rule/optimizer parameters that affect the output
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, pd.DataFrame):
+        digest.update(",".join(map(str, source.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(source, index=True).values.tobytes())
+    else:
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _entry_path(key, cache_dir):
+    return os.path.join(cache_dir, f"{key}.pkl")
+
+
+def load_cached(key, cache_dir=CACHE_DIR):
+    """Return the cached value for `key`, or None on a miss."""
+    path = _entry_path(key, cache_dir)
+    try:
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    # Refresh the timestamp so eviction drops least recently used entries
+    os.utime(path)
+    return value
+
+
+def store_cached(key, value, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(value, f)
+    os.replace(tmp_path, path)
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Delete least recently used entries until the cache fits in `max_bytes`."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".pkl"):
+            stat = os.stat(os.path.join(cache_dir, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(os.path.join(cache_dir, name))
+        total -= size
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+PORTFOLIO_LABEL = "Portfolio"
+RISK_COLUMNS = ["VaR", "CVaR", "Parametric VaR", "Parametric CVaR",
+                "Max Drawdown", "Sortino Ratio", "Beta"]
+
+
+def _historical_tail(values, alpha):
+    """
+    Historical VaR and CVaR for every column with a single np.partition call.
+
+    Partitioning around the tail order statistic is O(n) per column instead
+    of the O(n log n) full sort a quantile would do. NaNs are pushed to the
+    end as +inf so each column uses only its own observations.
+    """
+    filled = np.where(np.isnan(values), np.inf, values)
+    n_valid = np.isfinite(filled).sum(axis=0)
+    k = np.maximum(np.floor(alpha * (n_valid - 1)).astype(int), 0)
+    part = np.partition(filled, np.unique(k), axis=0)
+
+    cols = np.arange(values.shape[1])
+    var = -part[k, cols]
+    in_tail = np.arange(values.shape[0])[:, None] <= k
+    cvar = -np.where(in_tail, part, 0.0).sum(axis=0) / (k + 1)
+
+    empty = n_valid == 0
+    var[empty] = np.nan
+    cvar[empty] = np.nan
+    return var, cvar
+
+
+def _max_drawdown(values):
+    wealth = np.cumprod(1 + np.nan_to_num(values), axis=0)
+    peak = np.maximum.accumulate(wealth, axis=0)
+    return -(wealth / peak - 1).min(axis=0)
+
+
+def _beta(values, benchmark):
+    bench = np.broadcast_to(benchmark[:, None], values.shape)
+    valid = ~np.isnan(values) & ~np.isnan(bench)
+    n = valid.sum(axis=0)
+    r = np.where(valid, values, 0.0)
+    b = np.where(valid, bench, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_dev = np.where(valid, r - r.sum(axis=0) / n, 0.0)
+        b_dev = np.where(valid, b - b.sum(axis=0) / n, 0.0)
+        return (r_dev * b_dev).sum(axis=0) / (b_dev ** 2).sum(axis=0)
+
+
+def compute_risk_metrics(returns, benchmark=None, weights=None, alpha=0.05,
+                         periods_per_year=252):
+    """
+    Tail, drawdown and downside risk for every ticker and the portfolio.
+
+    Args:
+        returns (DataFrame): Per-period simple returns, one column per ticker
+        benchmark (Series): Index returns for beta; Beta is NaN without it
+        weights (array or Series): Portfolio weights; adds a 'Portfolio' row
+        alpha (float): Tail probability for VaR/CVaR (0.05 -> 95% VaR)
+        periods_per_year (int): Annualization factor for the Sortino ratio
+
+    Returns:
+        DataFrame: One row per ticker (plus 'Portfolio'). VaR, CVaR and
+        Max Drawdown are positive loss fractions per period; VaR/CVaR come
+        historical and parametric (normal).
+    """
+    frame = returns
+    if weights is not None:
+        weights = pd.Series(np.asarray(weights, dtype=float), index=returns.columns)
+        frame = returns.assign(**{PORTFOLIO_LABEL: returns.fillna(0.0) @ weights})
+
+    values = frame.to_numpy(dtype=float)
+    var, cvar = _historical_tail(values, alpha)
+
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0, ddof=1)
+    z = norm.ppf(alpha)
+    param_var = -(mean + z * std)
+    param_cvar = -(mean - std * norm.pdf(z) / alpha)
+
+    downside = np.sqrt(np.nanmean(np.minimum(values, 0.0) ** 2, axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sortino = mean / downside * np.sqrt(periods_per_year)
+
+    if benchmark is not None:
+        bench = benchmark.reindex(frame.index).to_numpy(dtype=float)
+        beta = _beta(values, bench)
+    else:
+        beta = np.full(values.shape[1], np.nan)
+
+    return pd.DataFrame({
+        "VaR": var,
+        "CVaR": cvar,
+        "Parametric VaR": param_var,
+        "Parametric CVaR": param_cvar,
+        "Max Drawdown": _max_drawdown(values),
+        "Sortino Ratio": sortino,
+        "Beta": beta,
+    }, index=frame.columns)
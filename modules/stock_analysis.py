@@ -1,21 +1,40 @@
 import pandas as pd
 import numpy as np
 
-def get_top_performers(duration, risk_level):
-    df = pd.read_csv("data/processed_data.csv", index_col=0)
+# Per risk level: the highest volatility quantile a stock may sit at, and the
+# share of its max drawdown (when the data has one) charged against its return
+RISK_PROFILES = {
+    "low": {"volatility_quantile": 0.5, "drawdown_penalty": 1.0},
+    "medium": {"volatility_quantile": 0.8, "drawdown_penalty": 0.5},
+    "high": {"volatility_quantile": 1.0, "drawdown_penalty": 0.0},
+}
+
+def get_top_performers(duration, risk_level, df=None, top_n=5):
+    # Callers holding the ranked universe in memory pass it as `df`
+    if df is None:
+        df = pd.read_csv("data/processed_data.csv", index_col=0)
+    else:
+        df = df.copy()
 
     # Normalize risk_level input
-    risk_multiplier = {"low": 0.5, "medium": 1, "high": 1.5}
-    risk_factor = risk_multiplier.get(risk_level.lower(), 1)
+    profile = RISK_PROFILES.get(risk_level.lower(), RISK_PROFILES["medium"])
 
     # Compute Sharpe Ratio
-    df["Sharpe_Ratio"] = df["1Y_Return"] / (df["Volatility"] * risk_factor)
+    df["Sharpe_Ratio"] = df["1Y_Return"] / df["Volatility"]
+
+    # Lower risk levels drop the most volatile stocks and rank on return
+    # net of drawdown, so the order changes with the risk level
+    df = df[df["Volatility"] <= df["Volatility"].quantile(profile["volatility_quantile"])]
+    score = df["1Y_Return"]
+    if "Max Drawdown" in df.columns:
+        score = score - profile["drawdown_penalty"] * df["Max Drawdown"].fillna(0) * 100
+    df["Score"] = score / df["Volatility"]
 
-    # Sort by Sharpe Ratio
-    df_sorted = df.sort_values(by="Sharpe_Ratio", ascending=False)
+    # Sort by risk-adjusted score
+    df_sorted = df.sort_values(by="Score", ascending=False)
     
     # Select top stocks
-    top_stocks = df_sorted.head(5)
+    top_stocks = df_sorted.head(top_n)
     
     return top_stocks
 
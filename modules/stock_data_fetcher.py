@@ -1,5 +1,8 @@
+import os
 import yfinance as yf
 import pandas as pd
+from modules.resampler import INTRADAY_INTERVALS, MARKET_TZ, MAX_PERIOD, price_path, last_timestamp
+from modules.adjustments import append_events, events_from_actions, fetch_log_path, record_fetch
 
 # List of Nifty 50 stock tickers
 NIFTY50_TICKERS = [
@@ -16,16 +19,60 @@ NIFTY50_TICKERS = [
     "VEDL.NS"
 ]
 
-def fetch_nifty50_data():
+def fetch_nifty50_data(period="1y", interval="1d"):
+    if interval in INTRADAY_INTERVALS:
+        period = MAX_PERIOD[interval]
+
     stock_data = {}
+    dividends = {}
+    splits = {}
     for ticker in NIFTY50_TICKERS:
         stock = yf.Ticker(ticker)
-        hist = stock.history(period="1y")  # Fetch 1-year data
+        # Yahoo's Close is already split adjusted but excludes dividends;
+        # dividends are applied at read time, splits are only recorded
+        hist = stock.history(period=period, interval=interval, auto_adjust=False, actions=True)
         stock_data[ticker] = hist['Close']
+        dividends[ticker] = hist.get('Dividends')
+        splits[ticker] = hist.get('Stock Splits')
+
+    events = events_from_actions(
+        pd.DataFrame({t: s for t, s in dividends.items() if s is not None}),
+        pd.DataFrame({t: s for t, s in splits.items() if s is not None}),
+    )
+    if not events.empty:
+        append_events(events)
 
     df = pd.DataFrame(stock_data)
-    df.to_csv("data/nifty50_data.csv")
-    print("Nifty 50 stock data saved successfully.")
+    path = price_path(interval)
+    if interval in INTRADAY_INTERVALS:
+        append_bars(df, path)
+    else:
+        df.to_csv(path)
+    print(f"Nifty 50 {interval} stock data saved successfully.")
+
+def append_bars(df, path):
+    # Intraday lookback is capped by yfinance, so bars accumulate across runs.
+    # Stored bars keep the split basis of the fetch that wrote them, so each
+    # appended block is logged with its fetch time for the read-time adjustment
+    fetched = pd.Timestamp.now(tz=MARKET_TZ)
+    if not os.path.exists(path):
+        df.to_csv(path)
+        if not df.empty:
+            record_fetch(path, df.index.max(), fetched)
+        return
+
+    last = last_timestamp(path)
+    if last is not None and not os.path.exists(fetch_log_path(path)):
+        # Bars stored before fetches were logged have an unknown basis
+        record_fetch(path, last)
+    if last is not None:
+        df = df[df.index > last]
+    if df.empty:
+        return
+
+    columns = pd.read_csv(path, index_col=0, nrows=0).columns
+    df.reindex(columns=columns).to_csv(path, mode="a", header=False)
+    record_fetch(path, df.index.max(), fetched)
 
 if __name__ == "__main__":
-    fetch_nifty50_data()
+    fetch_nifty50_data(interval=os.environ.get("STOCK_INTERVAL", "1d"))
@@ -9,11 +9,33 @@ import numpy as np
 import os
 import requests
 from datetime import datetime
+from modules.result_cache import cache_key, load_cached, store_cached
+from modules.profiling import stage, start_run, write_summary
 
 # Telegram bot configuration
 TELEGRAM_BOT_TOKEN = os.environ.get('TELEGRAM_BOT_TOKEN', '')  # Set this as an environment variable
 TELEGRAM_CHAT_ID = os.environ.get('TELEGRAM_CHAT_ID', '')      # Set this as an environment variable
 
+# Maximum Buy signals kept per correlation cluster
+MAX_BUYS_PER_CLUSTER = 2
+
+PROCESSED_DATA_PATH = 'data/processed.csv'
+
+# Metrics that raise / lower the Strength score. Sortino and CVaR come from
+# the risk engine and are used when the processed data includes them.
+STRENGTH_REWARD_METRICS = ('Sharpe Ratio', 'Sortino Ratio')
+STRENGTH_PENALTY_METRICS = ('Volatility', 'CVaR')
+
+# Buy needs a Sharpe ratio above the high quantile and volatility below the
+# low one; Sell is the reverse
+SIGNAL_HIGH_QUANTILE = 0.7
+SIGNAL_LOW_QUANTILE = 0.3
+
+# Strength starts at the neutral score; rewards and penalties each move it
+# by up to STRENGTH_WEIGHT points
+STRENGTH_NEUTRAL = 50
+STRENGTH_WEIGHT = 25
+
 def load_processed_data(filepath='data/processed.csv'):
     """
     Load the processed stock data from CSV
@@ -38,12 +60,14 @@ def load_processed_data(filepath='data/processed.csv'):
         print(f"Error loading processed data: {e}")
         return None
 
-def generate_recommendations(data):
+def generate_recommendations(data, max_per_cluster=MAX_BUYS_PER_CLUSTER):
     """
     Generate stock recommendations based on financial metrics
     
     Args:
         data (DataFrame): Processed stock data
+        max_per_cluster (int): Buy signals kept per correlation cluster when
+            the data has a 'Cluster' column; weaker ones are downgraded to Hold
         
     Returns:
         DataFrame: Stock recommendations with buy/hold/sell signals
@@ -61,33 +85,30 @@ def generate_recommendations(data):
         recommendations['Signal'] = 'Hold'  # Default to Hold
         
         # Example: Buy signal for stocks with high Sharpe ratio and low volatility
-        buy_condition = (recommendations['Sharpe Ratio'] > recommendations['Sharpe Ratio'].quantile(0.7)) & \
-                         (recommendations['Volatility'] < recommendations['Volatility'].quantile(0.3))
+        buy_condition = (recommendations['Sharpe Ratio'] > recommendations['Sharpe Ratio'].quantile(SIGNAL_HIGH_QUANTILE)) & \
+                         (recommendations['Volatility'] < recommendations['Volatility'].quantile(SIGNAL_LOW_QUANTILE))
         recommendations.loc[buy_condition, 'Signal'] = 'Buy'
         
         # Example: Sell signal for stocks with low Sharpe ratio and high volatility
-        sell_condition = (recommendations['Sharpe Ratio'] < recommendations['Sharpe Ratio'].quantile(0.3)) & \
-                          (recommendations['Volatility'] > recommendations['Volatility'].quantile(0.7))
+        sell_condition = (recommendations['Sharpe Ratio'] < recommendations['Sharpe Ratio'].quantile(SIGNAL_LOW_QUANTILE)) & \
+                          (recommendations['Volatility'] > recommendations['Volatility'].quantile(SIGNAL_HIGH_QUANTILE))
         recommendations.loc[sell_condition, 'Signal'] = 'Sell'
         
         # Add a recommendation strength score (0-100)
-        recommendations['Strength'] = 50  # Default neutral score
+        recommendations['Strength'] = STRENGTH_NEUTRAL  # Default neutral score
         
-        # Adjust strength based on Sharpe ratio (higher is better)
-        sharpe_min = recommendations['Sharpe Ratio'].min()
-        sharpe_max = recommendations['Sharpe Ratio'].max()
-        sharpe_range = sharpe_max - sharpe_min
+        # Adjust strength by return-to-risk (higher is better) and risk
+        # (lower is better). Each side moves the score by up to STRENGTH_WEIGHT points,
+        # split evenly over whichever of its metrics the data provides.
+        rewards = [c for c in STRENGTH_REWARD_METRICS if c in recommendations.columns]
+        penalties = [c for c in STRENGTH_PENALTY_METRICS if c in recommendations.columns]
         
-        if sharpe_range > 0:
-            recommendations['Strength'] += 25 * (recommendations['Sharpe Ratio'] - sharpe_min) / sharpe_range
-            
-        # Adjust strength based on volatility (lower is better)
-        vol_min = recommendations['Volatility'].min()
-        vol_max = recommendations['Volatility'].max()
-        vol_range = vol_max - vol_min
-        
-        if vol_range > 0:
-            recommendations['Strength'] -= 25 * (recommendations['Volatility'] - vol_min) / vol_range
+        for metrics, sign in ((rewards, 1), (penalties, -1)):
+            for column in metrics:
+                col_min = recommendations[column].min()
+                col_range = recommendations[column].max() - col_min
+                if col_range > 0:
+                    recommendations['Strength'] += sign * STRENGTH_WEIGHT / len(metrics) * (recommendations[column] - col_min) / col_range
         
         # Ensure strength is between 0 and 100
         recommendations['Strength'] = recommendations['Strength'].clip(0, 100)
@@ -96,6 +117,13 @@ def generate_recommendations(data):
         # Sort by Strength (descending)
         recommendations = recommendations.sort_values('Strength', ascending=False)
         
+        # Keep only the strongest Buy signals within each correlation cluster
+        if 'Cluster' in recommendations.columns:
+            buys = recommendations[recommendations['Signal'] == 'Buy']
+            rank_in_cluster = buys.groupby('Cluster').cumcount()
+            capped = rank_in_cluster[rank_in_cluster >= max_per_cluster].index
+            recommendations.loc[capped, 'Signal'] = 'Hold'
+        
         # Debug output to verify tickers are available
         print("Recommendations index (tickers):")
         print(recommendations.index.tolist())
@@ -220,58 +248,99 @@ def send_processed_data(filepath='data/processed.csv'):
         # Read with index
         data = pd.read_csv(filepath, index_col=0)
         
-        # Format the data as a message
-        current_date = datetime.now().strftime("%Y-%m-%d")
-        message = f"*NIFTY 50 Processed Data - {current_date}*\n\n"
-        
-        # Add summary statistics
-        message += "*Summary Statistics:*\n"
-        message += f"- Number of stocks: {len(data)}\n"
-        
-        # Add top 5 performing stocks
-        if 'Average Return' in data.columns:
-            top_performers = data.sort_values('Average Return', ascending=False).head(5)
-            message += "\n*Top Performers (Average Return):*\n"
-            for ticker, row in top_performers.iterrows():
-                message += f"- {ticker}: {row['Average Return']:.4f}\n"
-        
-        # Add top 5 stocks by allocation weight
-        if 'Weight' in data.columns:
-            top_weights = data.sort_values('Weight', ascending=False).head(5)
-            message += "\n*Top Allocation Weights:*\n"
-            for ticker, row in top_weights.iterrows():
-                message += f"- {ticker}: {row['Weight']:.4f} ({row['Weight']*100:.1f}%)\n"
-        
-        # If message is too long, truncate it (Telegram has a 4096 character limit)
-        if len(message) > 4000:
-            message = message[:3950] + "\n\n*[Message truncated due to length]*"
-            
-        return send_telegram_message(message)
+        return send_telegram_message(format_processed_data_message(data))
         
     except Exception as e:
         print(f"Error sending processed data: {e}")
         send_telegram_message(f"Error processing data: {str(e)}")
         return False
 
-def main():
+def format_processed_data_message(data):
     """
-    Main function to run the stock recommendations workflow
+    Format processed data as a Telegram message
+    
+    Args:
+        data (DataFrame): Processed stock data
+        
+    Returns:
+        str: Formatted message
+    """
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    message = f"*NIFTY 50 Processed Data - {current_date}*\n\n"
+    
+    # Add summary statistics
+    message += "*Summary Statistics:*\n"
+    message += f"- Number of stocks: {len(data)}\n"
+    
+    # Add top 5 performing stocks
+    if 'Average Return' in data.columns:
+        top_performers = data.sort_values('Average Return', ascending=False).head(5)
+        message += "\n*Top Performers (Average Return):*\n"
+        for ticker, row in top_performers.iterrows():
+            message += f"- {ticker}: {row['Average Return']:.4f}\n"
+    
+    # Add top 5 stocks by allocation weight
+    if 'Weight' in data.columns:
+        top_weights = data.sort_values('Weight', ascending=False).head(5)
+        message += "\n*Top Allocation Weights:*\n"
+        for ticker, row in top_weights.iterrows():
+            message += f"- {ticker}: {row['Weight']:.4f} ({row['Weight']*100:.1f}%)\n"
+    
+    # If message is too long, truncate it (Telegram has a 4096 character limit)
+    if len(message) > 4000:
+        message = message[:3950] + "\n\n*[Message truncated due to length]*"
+        
+    return message
+
+def run_workflow(run=None):
+    """
+    Run the stock recommendations workflow stage by stage
+    
+    Args:
+        run (dict): Profiling run from modules.profiling.start_run, or None
     """
     print("NIFTY 50 Stock Recommendations Generator")
     print("---------------------------------------")
     
-    # Load processed data
-    data = load_processed_data()
-    if data is None:
-        print("Failed to load processed data. Exiting.")
-        return
+    # Reuse earlier results when the processed data and rules are unchanged.
+    # Messages carry the date, so entries are only reused within a day.
+    key = None
+    cached = None
+    if os.path.exists(PROCESSED_DATA_PATH):
+        key = cache_key(PROCESSED_DATA_PATH, {
+            'max_per_cluster': MAX_BUYS_PER_CLUSTER,
+            'strength_rewards': STRENGTH_REWARD_METRICS,
+            'strength_penalties': STRENGTH_PENALTY_METRICS,
+            'signal_quantiles': (SIGNAL_HIGH_QUANTILE, SIGNAL_LOW_QUANTILE),
+            'strength_weights': (STRENGTH_NEUTRAL, STRENGTH_WEIGHT),
+            'date': datetime.now().strftime("%Y-%m-%d"),
+        })
+        with stage(run, 'cache_lookup'):
+            cached = load_cached(key)
     
-    # Generate recommendations
-    print("Generating stock recommendations...")
-    recommendations = generate_recommendations(data)
-    if recommendations is None:
-        print("Failed to generate recommendations. Exiting.")
-        return
+    if cached is not None:
+        print("Using cached recommendations for unchanged processed data")
+        recommendations, message, data_message = cached
+    else:
+        # Load processed data
+        with stage(run, 'load'):
+            data = load_processed_data(PROCESSED_DATA_PATH)
+        if data is None:
+            print("Failed to load processed data. Exiting.")
+            return
+        
+        # Generate recommendations
+        print("Generating stock recommendations...")
+        with stage(run, 'generate'):
+            recommendations = generate_recommendations(data)
+        if recommendations is None:
+            print("Failed to generate recommendations. Exiting.")
+            return
+        
+        with stage(run, 'format'):
+            message = format_recommendations_message(recommendations)
+            data_message = format_processed_data_message(data)
+            store_cached(key, (recommendations, message, data_message))
     
     # Save recommendations to file
     try:
@@ -281,9 +350,9 @@ def main():
     except Exception as e:
         print(f"Error saving recommendations: {e}")
     
-    # Format and send recommendations
-    message = format_recommendations_message(recommendations)
-    success = send_telegram_message(message)
+    # Send recommendations
+    with stage(run, 'telegram_recommendations'):
+        success = send_telegram_message(message)
     
     if success:
         print("Recommendations sent to Telegram successfully")
@@ -292,12 +361,26 @@ def main():
     
     # Send processed data
     print("Sending processed data to Telegram...")
-    success = send_processed_data()
+    with stage(run, 'telegram_processed_data'):
+        success = send_telegram_message(data_message)
     
     if success:
         print("Processed data sent to Telegram successfully")
     else:
         print("Failed to send processed data to Telegram")
 
+def main():
+    """
+    Main function to run the stock recommendations workflow
+    
+    Pass --profile or set STOCK_PROFILE=1 to write per-stage cProfile dumps
+    and a hot-function summary under data/profiles.
+    """
+    run = start_run('recommendations')
+    try:
+        run_workflow(run)
+    finally:
+        write_summary(run)
+
 if __name__ == "__main__":
     main()